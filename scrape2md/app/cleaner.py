@@ -1,8 +1,7 @@
-import re
-from bs4 import BeautifulSoup, Comment
-from markdownify import markdownify as md
-from typing import List, Optional
+from bs4 import BeautifulSoup, Comment, Tag
+from typing import List, Optional, Tuple, Union
 from urllib.parse import urljoin, urlparse
+from app.converter import MarkdownConverter
 
 class HTMLCleaner:
     TAGS_TO_REMOVE: List[str] = [
@@ -16,10 +15,26 @@ class HTMLCleaner:
         'hidden', 'modal'
     ]
 
+    COMMON_SELECTORS: List[str] = [
+        '#content', '#main', '#app', '#root', 
+        '.content', '.post-content', '.article-body', '.entry-content',
+        '[role="main"]'
+    ]
+
     @staticmethod
     def clean_html(html_content: str, remove_selector: Optional[str] = None) -> str:
+        node, _ = HTMLCleaner.extract_content_node(html_content, remove_selector)
+        return str(node) if node is not None else ""
+
+    @staticmethod
+    def extract_content_node(html_content: str, remove_selector: Optional[str] = None, content_selector: Optional[str] = None) -> Tuple[Optional[Tag], Optional[str]]:
+        """
+        Cleans the HTML and isolates the main content.
+        Returns the content element and the selector that matched it. A known
+        content_selector is tried first so the usual probing can be skipped.
+        """
         if not html_content:
-            return ""
+            return None, None
             
         soup: BeautifulSoup = BeautifulSoup(html_content, 'html.parser')
 
@@ -52,25 +67,28 @@ class HTMLCleaner:
                 tag.decompose()
                 continue
 
+        if content_selector:
+            try:
+                candidate = soup.select_one(content_selector)
+            except Exception:
+                candidate = None
+            if candidate and len(candidate.get_text(strip=True)) > 200:
+                return candidate, content_selector
+
         for tag_name in ['article', 'main']:
             candidate = soup.find(tag_name)
             if candidate and len(candidate.get_text(strip=True)) > 200:
-                return str(candidate)
-
-        common_selectors: List[str] = [
-            '#content', '#main', '#app', '#root', 
-            '.content', '.post-content', '.article-body', '.entry-content',
-            '[role="main"]'
-        ]
-        for selector in common_selectors:
+                return candidate, tag_name
+
+        for selector in HTMLCleaner.COMMON_SELECTORS:
             candidate = soup.select_one(selector)
             if candidate and len(candidate.get_text(strip=True)) > 200:
-                return str(candidate)
+                return candidate, selector
         
         if soup.body:
-            return str(soup.body)
+            return soup.body, 'body'
             
-        return str(soup)
+        return soup, None
 
     @staticmethod
     def extract_links(html_content: str, base_url: str) -> List[str]:
@@ -91,13 +109,17 @@ class HTMLCleaner:
         return list(links)
 
     @staticmethod
-    def to_markdown(html_content: str, include_images: bool = False) -> str:
-        markdown: str = md(
-            html_content, 
-            heading_style="ATX", 
-            strip=['img'] if not include_images else [] 
-        )
-        
-        cleaned_markdown: str = re.sub(r'\n\s*\n', '\n\n', markdown).strip()
-        
-        return cleaned_markdown
\ No newline at end of file
+    def to_markdown(html_content: Union[str, Tag, None], include_images: bool = False) -> str:
+        """
+        Converts HTML to Markdown. Pass the element returned by
+        extract_content_node to convert it without serializing and re-parsing.
+        """
+        if html_content is None:
+            return ""
+        if isinstance(html_content, Tag):
+            # Decomposing noise leaves neighbouring text nodes split; merge them
+            # so the tree matches what re-parsing the cleaned HTML would give.
+            html_content.smooth()
+        else:
+            html_content = BeautifulSoup(html_content, 'html.parser')
+        return MarkdownConverter(include_images).convert(html_content)
\ No newline at end of file
@@ -0,0 +1,529 @@
+import re
+from bs4 import Comment, Doctype, NavigableString, Tag
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+_HEADING = re.compile(r'h(\d+)')
+_LINE_WITH_CONTENT = re.compile(r'^(.*)', flags=re.MULTILINE)
+_WHITESPACE = re.compile(r'[\t ]+')
+_ALL_WHITESPACE = re.compile(r'[\t \r\n]+')
+_NEWLINE_WHITESPACE = re.compile(r'[\t \r\n]*[\r\n][\t \r\n]*')
+_PRE_LSTRIP = re.compile(r'^[ \n]*\n')
+_PRE_RSTRIP = re.compile(r'[ \n]*$')
+_EXTRACT_NEWLINES = re.compile(r'^(\n*)((?:.*[^\n])?)(\n*)$', flags=re.DOTALL)
+_BACKTICK_RUNS = re.compile(r'`+')
+_BLANK_LINES = re.compile(r'\n\s*\n')
+
+_BLOCK_TAGS: FrozenSet[str] = frozenset([
+    'p', 'blockquote', 'article', 'div', 'section', 'ol', 'ul', 'li',
+    'dl', 'dt', 'dd', 'table', 'thead', 'tbody', 'tfoot', 'tr', 'td', 'th'
+])
+_NOFORMAT_TAGS: FrozenSet[str] = frozenset(['pre', 'code', 'kbd', 'samp'])
+_INLINE_MARKUP: Dict[str, str] = {
+    'b': '**', 'strong': '**', 'em': '*', 'i': '*', 'del': '~~', 's': '~~', 'sub': '', 'sup': ''
+}
+
+# Block tags whose Markdown is just their stripped content between blank lines.
+# These are streamed into the writer instead of being rendered to a string.
+# The value is the set of characters stripped, None meaning all whitespace.
+_STREAMED_BLOCKS: Dict[str, Optional[str]] = {
+    'div': None, 'article': None, 'section': None, 'dl': None, 'p': ' \t\r\n'
+}
+
+Converter = Callable[[Tag, str, FrozenSet[str]], str]
+
+def _is_heading(name: str) -> bool:
+    return _HEADING.match(name) is not None
+
+def _remove_whitespace_inside(el) -> bool:
+    if el is None or not el.name:
+        return False
+    return el.name in _BLOCK_TAGS or _is_heading(el.name)
+
+def _remove_whitespace_outside(el) -> bool:
+    return _remove_whitespace_inside(el) or (el is not None and el.name == 'pre')
+
+def _is_block_content_element(el) -> bool:
+    if isinstance(el, Tag):
+        return True
+    if isinstance(el, (Comment, Doctype)):
+        return False
+    if isinstance(el, NavigableString):
+        return el.strip() != ''
+    return False
+
+def _next_block_content_sibling(el):
+    while el is not None:
+        el = el.next_sibling
+        if _is_block_content_element(el):
+            return el
+    return None
+
+def _chomp(text: str) -> Tuple[str, str, str]:
+    prefix: str = ' ' if text and text[0] == ' ' else ''
+    suffix: str = ' ' if text and text[-1] == ' ' else ''
+    return prefix, suffix, text.strip()
+
+def _collapse(strings: List[str]) -> str:
+    """Joins sibling strings, merging newline runs at their boundaries (max 2)."""
+    out: List[str] = ['']
+    for child in strings:
+        leading, content, trailing = _EXTRACT_NEWLINES.match(child).groups()
+        if out[-1] and leading:
+            previous: str = out.pop()
+            leading = '\n' * min(2, max(len(previous), len(leading)))
+        out.extend((leading, content, trailing))
+    return ''.join(out)
+
+class _Level:
+    __slots__ = ('strip_chars', 'strips', 'has_child', 'mergeable', 'all_newline')
+
+    def __init__(self, strips: bool, strip_chars: Optional[str]):
+        self.strips: bool = strips
+        self.strip_chars: Optional[str] = strip_chars
+        self.has_child: bool = False
+        self.mergeable: bool = True
+        self.all_newline: bool = True
+
+class _MarkdownWriter:
+    """
+    Incremental Markdown output.
+
+    Trailing whitespace is held back until more content arrives so that newline
+    runs can be merged between blocks, stripped when a block closes and
+    collapsed to a single blank line before anything is committed.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._tail: str = ''
+        self._levels: List[_Level] = []
+
+    def open(self, strips: bool = False, strip_chars: Optional[str] = None) -> None:
+        self._levels.append(_Level(strips, strip_chars))
+
+    def close(self) -> None:
+        level: _Level = self._levels.pop()
+        if not level.has_child:
+            return
+
+        if level.strips:
+            self._tail = self._tail.rstrip(level.strip_chars) + '\n\n'
+            level.all_newline = False
+
+        if self._levels:
+            parent: _Level = self._levels[-1]
+            parent.mergeable = not level.all_newline
+            parent.all_newline = parent.all_newline and level.all_newline
+
+    def write(self, text: str) -> None:
+        levels: List[_Level] = self._levels
+        all_newline: bool = not text.strip('\n')
+
+        # Walk up to the nearest level that already has output; everything below
+        # it is receiving its first child, so unopened blocks strip and open here.
+        boundary: int = len(levels) - 1
+        while boundary >= 0 and not levels[boundary].has_child:
+            level: _Level = levels[boundary]
+            if level.strips:
+                text = text.lstrip(level.strip_chars)
+                if not text:
+                    return
+                text = '\n\n' + text
+            boundary -= 1
+
+        if boundary >= 0 and levels[boundary].mergeable:
+            text = self._merge_leading_newlines(text)
+
+        for index in range(boundary + 1, len(levels)):
+            levels[index].has_child = True
+        if levels:
+            levels[-1].mergeable = not all_newline
+            levels[-1].all_newline = levels[-1].all_newline and all_newline
+
+        self._append(text)
+
+    def _merge_leading_newlines(self, text: str) -> str:
+        leading: int = len(text) - len(text.lstrip('\n'))
+        if not leading:
+            return text
+        trailing: int = len(self._tail) - len(self._tail.rstrip('\n'))
+        if not trailing:
+            return text
+        self._tail = self._tail[:len(self._tail) - trailing]
+        return '\n' * min(2, max(trailing, leading)) + text[leading:]
+
+    def _append(self, text: str) -> None:
+        combined: str = self._tail + text if self._tail else text
+        body: str = combined.rstrip()
+        self._tail = combined[len(body):]
+        if not body:
+            return
+        if not self._parts:
+            body = body.lstrip()
+        self._parts.append(_BLANK_LINES.sub('\n\n', body))
+
+    def getvalue(self) -> str:
+        return ''.join(self._parts)
+
+class MarkdownConverter:
+    """
+    Converts a parsed BeautifulSoup tree to Markdown in a single walk.
+
+    Output matches markdownify(heading_style="ATX") followed by collapsing
+    blank lines and stripping. Plain block containers (div, p, article, ...)
+    are streamed into a _MarkdownWriter; only elements whose Markdown depends
+    on their rendered content (lists, tables, headings, links, ...) are built
+    up as strings first.
+    """
+
+    def __init__(self, include_images: bool = False):
+        self.include_images: bool = include_images
+        self._root: Optional[Tag] = None
+        self._converters: Dict[str, Optional[Converter]] = {
+            'a': self._convert_a,
+            'blockquote': self._convert_blockquote,
+            'br': self._convert_br,
+            'code': self._convert_code,
+            'kbd': self._convert_code,
+            'samp': self._convert_code,
+            'div': self._convert_div,
+            'article': self._convert_div,
+            'section': self._convert_div,
+            'dl': self._convert_div,
+            'dd': self._convert_dd,
+            'dt': self._convert_dt,
+            'hr': self._convert_hr,
+            'video': self._convert_video,
+            'ul': self._convert_list,
+            'ol': self._convert_list,
+            'li': self._convert_li,
+            'p': self._convert_p,
+            'pre': self._convert_pre,
+            'q': self._convert_q,
+            'script': self._convert_empty,
+            'style': self._convert_empty,
+            'table': self._convert_table,
+            'caption': self._convert_caption,
+            'figcaption': self._convert_figcaption,
+            'td': self._convert_cell,
+            'th': self._convert_cell,
+            'tr': self._convert_tr,
+        }
+        for name, markup in _INLINE_MARKUP.items():
+            self._converters[name] = self._inline_converter(markup)
+        if include_images:
+            self._converters['img'] = self._convert_img
+
+    def convert(self, node: Tag) -> str:
+        self._root = node
+        # A bare tag is treated as the only child of a document, like markdownify does.
+        parent_tags: FrozenSet[str] = frozenset() if node.name == '[document]' else frozenset(['[document]'])
+
+        writer = _MarkdownWriter()
+        if self._is_streamed(node, parent_tags):
+            self._stream(node, parent_tags, writer)
+        else:
+            text: str = self._render_tag(node, parent_tags)
+            if text:
+                writer.write(text)
+        return writer.getvalue()
+
+    def _converter_for(self, name: str) -> Optional[Converter]:
+        if name not in self._converters:
+            match = _HEADING.match(name)
+            if match:
+                level: int = int(match.group(1))
+                self._converters[name] = lambda el, text, parent_tags: self._convert_heading(level, text, parent_tags)
+            else:
+                self._converters[name] = None
+        return self._converters[name]
+
+    def _is_streamed(self, node: Tag, parent_tags: FrozenSet[str]) -> bool:
+        if '_inline' in parent_tags or 'pre' in parent_tags:
+            return False
+        return node.name in _STREAMED_BLOCKS or self._converter_for(node.name) is None
+
+    def _children_to_convert(self, node: Tag) -> List:
+        remove_inside: bool = _remove_whitespace_inside(node)
+        children: List = []
+        for el in node.children:
+            if isinstance(el, Tag):
+                children.append(el)
+            elif isinstance(el, (Comment, Doctype)):
+                continue
+            elif isinstance(el, NavigableString):
+                if el.strip() != '':
+                    children.append(el)
+                elif remove_inside and (not el.previous_sibling or not el.next_sibling):
+                    continue
+                elif _remove_whitespace_outside(el.previous_sibling) or _remove_whitespace_outside(el.next_sibling):
+                    continue
+                else:
+                    children.append(el)
+        return children
+
+    def _stream(self, node: Tag, parent_tags: FrozenSet[str], writer: _MarkdownWriter) -> None:
+        name: str = node.name
+        writer.open(name in _STREAMED_BLOCKS, _STREAMED_BLOCKS.get(name))
+
+        child_tags: FrozenSet[str] = parent_tags | {name}
+        for el in self._children_to_convert(node):
+            if isinstance(el, Tag) and self._is_streamed(el, child_tags):
+                self._stream(el, child_tags, writer)
+                continue
+            text: str = self._render_element(el, child_tags)
+            if text:
+                writer.write(text)
+
+        writer.close()
+
+    def _render_element(self, el, parent_tags: FrozenSet[str]) -> str:
+        if isinstance(el, NavigableString):
+            return self._render_text(el, parent_tags)
+        return self._render_tag(el, parent_tags)
+
+    def _render_tag(self, node: Tag, parent_tags: FrozenSet[str]) -> str:
+        name: str = node.name
+        extra_tags: List[str] = [name]
+        if _is_heading(name) or name in ('td', 'th'):
+            extra_tags.append('_inline')
+        if name in _NOFORMAT_TAGS:
+            extra_tags.append('_noformat')
+        child_tags: FrozenSet[str] = parent_tags.union(extra_tags)
+
+        strings: List[str] = []
+        for el in self._children_to_convert(node):
+            text: str = self._render_element(el, child_tags)
+            if text:
+                strings.append(text)
+
+        if name == 'pre' or 'pre' in parent_tags:
+            text = ''.join(strings)
+        else:
+            text = _collapse(strings)
+
+        convert: Optional[Converter] = self._converter_for(name)
+        return convert(node, text, parent_tags) if convert else text
+
+    def _render_text(self, el: NavigableString, parent_tags: FrozenSet[str]) -> str:
+        text: str = str(el)
+
+        if 'pre' not in parent_tags:
+            text = _NEWLINE_WHITESPACE.sub('\n', text)
+            text = _WHITESPACE.sub(' ', text)
+
+        if '_noformat' not in parent_tags and text:
+            text = text.replace('*', r'\*').replace('_', r'\_')
+
+        previous_sibling = el.previous_sibling
+        next_sibling = el.next_sibling
+        remove_inside: bool = _remove_whitespace_inside(el.parent)
+        if _remove_whitespace_outside(previous_sibling) or (remove_inside and not previous_sibling):
+            text = text.lstrip(' \t\r\n')
+        if _remove_whitespace_outside(next_sibling) or (remove_inside and not next_sibling):
+            text = text.rstrip()
+
+        return text
+
+    @staticmethod
+    def _inline_converter(markup: str) -> Converter:
+        def convert(el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+            if '_noformat' in parent_tags:
+                return text
+            prefix, suffix, text = _chomp(text)
+            if not text:
+                return ''
+            return f"{prefix}{markup}{text}{markup}{suffix}"
+        return convert
+
+    def _convert_a(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        if '_noformat' in parent_tags:
+            return text
+        prefix, suffix, text = _chomp(text)
+        if not text:
+            return ''
+        href = el.get('href')
+        title = el.get('title')
+        if text.replace(r'\_', '_') == href and not title:
+            return f"<{href}>"
+        title_part: str = ' "%s"' % title.replace('"', r'\"') if title else ''
+        return f"{prefix}[{text}]({href}{title_part}){suffix}" if href else text
+
+    def _convert_blockquote(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        text = (text or '').strip(' \t\r\n')
+        if '_inline' in parent_tags:
+            return ' ' + text + ' '
+        if not text:
+            return '\n'
+        text = _LINE_WITH_CONTENT.sub(lambda m: '> ' + m.group(1) if m.group(1) else '>', text)
+        return '\n' + text + '\n\n'
+
+    def _convert_br(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        if '_inline' in parent_tags:
+            return text + ' ' if text else ' '
+        return '  \n' + text
+
+    def _convert_code(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        if '_noformat' in parent_tags:
+            return text
+        prefix, suffix, text = _chomp(text)
+        if not text:
+            return ''
+        max_backticks: int = max((len(run) for run in _BACKTICK_RUNS.findall(text)), default=0)
+        delimiter: str = '`' * (max_backticks + 1)
+        if max_backticks > 0:
+            text = ' ' + text + ' '
+        return f"{prefix}{delimiter}{text}{delimiter}{suffix}"
+
+    def _convert_div(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        if '_inline' in parent_tags:
+            return ' ' + text.strip() + ' '
+        text = text.strip()
+        return '\n\n%s\n\n' % text if text else ''
+
+    def _convert_dd(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        text = (text or '').strip()
+        if '_inline' in parent_tags:
+            return ' ' + text + ' '
+        if not text:
+            return '\n'
+        text = _LINE_WITH_CONTENT.sub(lambda m: '    ' + m.group(1) if m.group(1) else '', text)
+        return ':' + text[1:] + '\n'
+
+    def _convert_dt(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        text = _ALL_WHITESPACE.sub(' ', (text or '').strip())
+        if '_inline' in parent_tags:
+            return ' ' + text + ' '
+        if not text:
+            return '\n'
+        return '\n\n%s\n' % text
+
+    def _convert_heading(self, level: int, text: str, parent_tags: FrozenSet[str]) -> str:
+        if '_inline' in parent_tags:
+            return text
+        level = max(1, min(6, level))
+        text = _ALL_WHITESPACE.sub(' ', text.strip())
+        return '\n\n%s %s\n\n' % ('#' * level, text)
+
+    def _convert_hr(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        return '\n\n---\n\n'
+
+    def _convert_img(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        alt = el.attrs.get('alt', None) or ''
+        src = el.attrs.get('src', None) or ''
+        title = el.attrs.get('title', None) or ''
+        title_part: str = ' "%s"' % title.replace('"', r'\"') if title else ''
+        if '_inline' in parent_tags:
+            return alt
+        return '![%s](%s%s)' % (alt, src, title_part)
+
+    def _convert_video(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        if '_inline' in parent_tags:
+            return text
+        src = el.attrs.get('src', None) or ''
+        if not src:
+            sources = el.find_all('source', attrs={'src': True})
+            if sources:
+                src = sources[0].attrs.get('src', None) or ''
+        poster = el.attrs.get('poster', None) or ''
+        if src and poster:
+            return '[![%s](%s)](%s)' % (text, poster, src)
+        if src:
+            return '[%s](%s)' % (text, src)
+        if poster:
+            return '![%s](%s)' % (text, poster)
+        return text
+
+    def _convert_list(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        next_sibling = None if el is self._root else _next_block_content_sibling(el)
+        before_paragraph: bool = bool(next_sibling) and next_sibling.name not in ('ul', 'ol')
+        if 'li' in parent_tags:
+            return '\n' + text.rstrip()
+        return '\n\n' + text + ('\n' if before_paragraph else '')
+
+    def _convert_li(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        text = (text or '').strip()
+        if not text:
+            return '\n'
+
+        parent = el.parent
+        if parent is not None and parent.name == 'ol':
+            start = parent.get('start')
+            first: int = int(start) if start and str(start).isnumeric() else 1
+            bullet: str = '%s.' % (first + len(el.find_previous_siblings('li')))
+        else:
+            depth: int = -1
+            node = el
+            while node is not None:
+                if node.name == 'ul':
+                    depth += 1
+                if node is self._root:
+                    break
+                node = node.parent
+            bullet = '*+-'[depth % 3]
+
+        bullet += ' '
+        indent: str = ' ' * len(bullet)
+        text = _LINE_WITH_CONTENT.sub(lambda m: indent + m.group(1) if m.group(1) else '', text)
+        return bullet + text[len(bullet):] + '\n'
+
+    def _convert_p(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        if '_inline' in parent_tags:
+            return ' ' + text.strip(' \t\r\n') + ' '
+        text = text.strip(' \t\r\n')
+        return '\n\n%s\n\n' % text if text else ''
+
+    def _convert_pre(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        if not text:
+            return ''
+        text = _PRE_RSTRIP.sub('', _PRE_LSTRIP.sub('', text))
+        return '\n\n```\n%s\n```\n\n' % text
+
+    def _convert_q(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        return '"' + text + '"'
+
+    def _convert_empty(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        return ''
+
+    def _convert_table(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        return '\n\n' + text.strip() + '\n\n'
+
+    def _convert_caption(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        return text.strip() + '\n\n'
+
+    def _convert_figcaption(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        return '\n\n' + text.strip() + '\n\n'
+
+    @staticmethod
+    def _colspan(cell: Tag) -> int:
+        if 'colspan' in cell.attrs and cell['colspan'].isdigit():
+            return max(1, min(1000, int(cell['colspan'])))
+        return 1
+
+    def _convert_cell(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        return ' ' + text.strip().replace('\n', ' ') + ' |' * self._colspan(el)
+
+    def _convert_tr(self, el: Tag, text: str, parent_tags: FrozenSet[str]) -> str:
+        cells = el.find_all(['td', 'th'])
+        parent = el.parent
+        is_first_row: bool = el.find_previous_sibling() is None
+        is_headrow: bool = (
+            all(cell.name == 'th' for cell in cells)
+            or (parent.name == 'thead' and len(parent.find_all('tr')) == 1)
+        )
+        is_head_row_missing: bool = (
+            (is_first_row and not parent.name == 'tbody')
+            or (is_first_row and parent.name == 'tbody' and len(parent.parent.find_all(['thead'])) < 1)
+        )
+        full_colspan: int = sum(self._colspan(cell) for cell in cells)
+
+        overline: str = ''
+        underline: str = ''
+        if is_headrow and is_first_row:
+            underline += '| ' + ' | '.join(['---'] * full_colspan) + ' |' + '\n'
+        elif is_head_row_missing or (
+            is_first_row and (parent.name == 'table' or (parent.name == 'tbody' and not parent.find_previous_sibling()))
+        ):
+            overline += '| ' + ' | '.join([''] * full_colspan) + ' |' + '\n'
+            overline += '| ' + ' | '.join(['---'] * full_colspan) + ' |' + '\n'
+        return overline + '|' + text + '\n' + underline
@@ -0,0 +1,274 @@
+import time
+import zlib
+import asyncio
+from fastapi import Request, Response
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Dict, List, Optional, Union
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES: List[str] = ["application/msgpack", "application/x-msgpack", "application/vnd.msgpack"]
+
+COMPRESSIBLE_TYPES: List[str] = [
+    "text/",
+    "application/json",
+    "application/msgpack",
+    "application/x-ndjson",
+    "application/xml",
+    "application/javascript",
+]
+
+# Whole bodies above this size are compressed off the event loop.
+THREAD_OFFLOAD_SIZE: int = 1024 * 1024
+
+def _parse_qvalues(header: str) -> Dict[str, float]:
+    values: Dict[str, float] = {}
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality: float = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        values[name] = quality
+    return values
+
+def available_encodings() -> List[str]:
+    """Content codings this process can produce, in server preference order."""
+    encodings: List[str] = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    accepted: Dict[str, float] = _parse_qvalues(accept_encoding)
+    best: Optional[str] = None
+    best_quality: float = 0.0
+    for encoding in available_encodings():
+        quality: float = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def wants_msgpack(accept: str) -> bool:
+    if msgpack is None or not accept:
+        return False
+    accepted: Dict[str, float] = _parse_qvalues(accept)
+    msgpack_quality: float = max(accepted.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    json_quality: float = accepted.get("application/json", accepted.get("application/*", accepted.get("*/*", 0.0)))
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+def negotiated_response(http_request: Request, model: BaseModel) -> Union[BaseModel, Response]:
+    """Returns the model as MessagePack when the client asks for it, otherwise leaves it to FastAPI's JSON encoding."""
+    if not wants_msgpack(http_request.headers.get("accept", "")):
+        return model
+    return Response(
+        msgpack.packb(model.model_dump(mode="json")),
+        media_type="application/msgpack",
+        headers={"Vary": "Accept"}
+    )
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int, zstd_level: int):
+        self.encoding: str = encoding
+        if encoding == "zstd":
+            self._impl = zstandard.ZstdCompressor(level=zstd_level).compressobj()
+        elif encoding == "br":
+            self._impl = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._impl = zlib.compressobj(gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """Compresses a chunk and flushes it so the client can decode it right away."""
+        if self.encoding == "zstd":
+            flush_mode: int = zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            return self._impl.compress(data) + self._impl.flush(flush_mode)
+        if self.encoding == "br":
+            return self._impl.process(data) + (self._impl.finish() if final else self._impl.flush())
+        return self._impl.compress(data) + self._impl.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class EncodingMetrics:
+    def __init__(self):
+        self.totals: Dict[str, Dict[str, float]] = {}
+        self.skipped: int = 0
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, seconds: float) -> None:
+        totals: Dict[str, float] = self.totals.setdefault(
+            encoding, {"responses": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0}
+        )
+        totals["responses"] += 1
+        totals["bytes_in"] += bytes_in
+        totals["bytes_out"] += bytes_out
+        totals["seconds"] += seconds
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "skipped_below_threshold": self.skipped,
+            "encodings": {
+                encoding: {
+                    "responses": int(totals["responses"]),
+                    "bytes_in": int(totals["bytes_in"]),
+                    "bytes_out": int(totals["bytes_out"]),
+                    "ratio": round(totals["bytes_in"] / totals["bytes_out"], 2) if totals["bytes_out"] else 0.0,
+                    "total_ms": round(totals["seconds"] * 1000, 1),
+                    "avg_ms": round(totals["seconds"] * 1000 / totals["responses"], 2),
+                }
+                for encoding, totals in self.totals.items()
+            }
+        }
+
+class CompressionMiddleware:
+    """
+    Negotiates zstd, brotli or gzip from Accept-Encoding.
+    Complete bodies are compressed once they reach minimum_size, streamed
+    bodies are compressed and flushed chunk by chunk as they are sent.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        metrics: Optional[EncodingMetrics] = None,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3
+    ):
+        self.app: ASGIApp = app
+        self.metrics: EncodingMetrics = metrics or EncodingMetrics()
+        self.minimum_size: int = minimum_size
+        self.gzip_level: int = gzip_level
+        self.brotli_quality: int = brotli_quality
+        self.zstd_level: int = zstd_level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding: Optional[str] = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+class _CompressingResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware: CompressionMiddleware = middleware
+        self.encoding: str = encoding
+        self._send: Send = send
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough: bool = False
+        self.bytes_in: int = 0
+        self.bytes_out: int = 0
+        self.seconds: float = 0.0
+
+    def _should_compress(self, status: int, headers: MutableHeaders, body_size: int, more_body: bool) -> bool:
+        if status in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        content_type: str = headers.get("content-type", "").lower()
+        if not any(content_type.startswith(prefix) for prefix in COMPRESSIBLE_TYPES):
+            return False
+
+        headers.add_vary_header("Accept-Encoding")
+        declared_size: Optional[str] = headers.get("content-length")
+        size: int = int(declared_size) if declared_size and declared_size.isdigit() else body_size
+        if (not more_body or declared_size) and size < self.middleware.minimum_size:
+            self.middleware.metrics.skipped += 1
+            return False
+        return True
+
+    def _compress(self, data: bytes, final: bool) -> bytes:
+        started: float = time.perf_counter()
+        compressed: bytes = self.compressor.compress(data, final)
+        self.seconds += time.perf_counter() - started
+        self.bytes_in += len(data)
+        self.bytes_out += len(compressed)
+        if final:
+            self.middleware.metrics.record(self.encoding, self.bytes_in, self.bytes_out, self.seconds)
+        return compressed
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if self.start_message is not None:
+            start_message: Message = self.start_message
+            self.start_message = None
+            await self._start(start_message, message)
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        more_body: bool = message.get("more_body", False)
+        await self._send({
+            "type": "http.response.body",
+            "body": self._compress(message.get("body", b""), final=not more_body),
+            "more_body": more_body,
+        })
+
+    async def _start(self, start_message: Message, message: Message) -> None:
+        headers = MutableHeaders(raw=start_message["headers"])
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+
+        if message["type"] != "http.response.body" or not self._should_compress(
+            start_message["status"], headers, len(body), more_body
+        ):
+            self.passthrough = True
+            await self._send(start_message)
+            await self._send(message)
+            return
+
+        self.compressor = _Compressor(
+            self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality, self.middleware.zstd_level
+        )
+        headers["Content-Encoding"] = self.encoding
+
+        if more_body:
+            if "content-length" in headers:
+                del headers["content-length"]
+            await self._send(start_message)
+            await self._send({"type": "http.response.body", "body": self._compress(body, final=False), "more_body": True})
+            return
+
+        if len(body) >= THREAD_OFFLOAD_SIZE:
+            compressed: bytes = await asyncio.to_thread(self._compress, body, True)
+        else:
+            compressed = self._compress(body, final=True)
+        headers["Content-Length"] = str(len(compressed))
+        await self._send(start_message)
+        await self._send({"type": "http.response.body", "body": compressed, "more_body": False})
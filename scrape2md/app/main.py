@@ -1,18 +1,23 @@
 import asyncio
 import sys
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from app.models import ScrapeRequest, ScrapeResponse, CrawlRequest, CrawlResponse, MapRequest, MapResponse, SearchRequest, SearchResponse, BatchScrapeRequest
+from fastapi.responses import StreamingResponse, Response, FileResponse
+from app.models import ScrapeRequest, ScrapeResponse, CrawlRequest, CrawlResponse, MapRequest, MapResponse, SearchRequest, SearchResponse, BatchScrapeRequest, ScreenshotRequest, PdfRequest, ArtifactResponse
 from app.scraper import ScraperService
+from app.spool import ArtifactSpool
+from app.profiles import ProfileStore
+from app.scheduler import PRIORITY_INTERACTIVE, PRIORITY_CRAWL, PRIORITY_BATCH, DEFAULT_QUEUE_TIMEOUTS
+from app.encoding import CompressionMiddleware, EncodingMetrics, negotiated_response
 from app.cleaner import HTMLCleaner
 from app.summarizer import LocalSummarizer
 import logging
 import io
 import zipfile
+import os
 import re
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("uvicorn")
@@ -22,12 +27,20 @@ if sys.platform == 'win32':
 
 scraper_service: ScraperService = ScraperService(max_concurrency=5)
 local_summarizer: LocalSummarizer = LocalSummarizer()
+artifact_spool: ArtifactSpool = ArtifactSpool(os.getenv("SCRAPE2MD_SPOOL_DIR"))
+profile_store: ProfileStore = ProfileStore(os.getenv("SCRAPE2MD_PROFILE_PATH"))
+encoding_metrics: EncodingMetrics = EncodingMetrics()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await scraper_service.start()
+    profile_flusher: asyncio.Task = asyncio.create_task(profile_store.flush_periodically())
+    spool_purger: asyncio.Task = asyncio.create_task(artifact_spool.purge_periodically())
     yield
+    profile_flusher.cancel()
+    spool_purger.cancel()
     await scraper_service.stop()
+    profile_store.flush()
 
 app = FastAPI(
     title="Scrape2MD",
@@ -51,15 +64,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    CompressionMiddleware,
+    metrics=encoding_metrics,
+    minimum_size=int(os.getenv("SCRAPE2MD_COMPRESS_MIN_SIZE", "1024")),
+)
+
+def _bind_client(http_request: Request, priority: int) -> str:
+    client_id: str = http_request.headers.get("X-Client-ID") or (http_request.client.host if http_request.client else "anonymous")
+
+    queue_timeout: Optional[float] = None
+    header_timeout: Optional[str] = http_request.headers.get("X-Queue-Timeout")
+    if header_timeout:
+        try:
+            queue_timeout = min(max(float(header_timeout), 0.1), DEFAULT_QUEUE_TIMEOUTS[priority])
+        except ValueError:
+            logger.warning(f"Ignoring invalid X-Queue-Timeout header: {header_timeout}")
+
+    scraper_service.scheduler.bind(priority, client_id, queue_timeout)
+    return client_id
+
+def _extract_markdown(url: str, raw_html: str, include_images: bool, use_profile: bool) -> str:
+    if use_profile:
+        return profile_store.extract_markdown(url, raw_html, include_images)
+    content, _ = HTMLCleaner.extract_content_node(raw_html)
+    return HTMLCleaner.to_markdown(content, include_images)
+
 @app.post("/scrape", response_model=ScrapeResponse)
-async def scrape_endpoint(request: ScrapeRequest) -> ScrapeResponse:
+async def scrape_endpoint(request: ScrapeRequest, http_request: Request) -> Union[ScrapeResponse, Response]:
+    _bind_client(http_request, PRIORITY_INTERACTIVE)
     try:
         logger.info(f"Received scrape request for: {request.url}")
         
+        use_profile: bool = request.use_profile and not request.target_selector
+        wait_for_selector: Optional[str] = request.wait_for_selector
+        if use_profile and not wait_for_selector:
+            wait_for_selector = profile_store.readiness_selector_for(str(request.url))
+
         scrape_result: Dict[str, Optional[str]] = await scraper_service.scrape_url(
             str(request.url), 
             formats=["markdown"], 
-            wait_for_selector=request.wait_for_selector,
+            wait_for_selector=wait_for_selector,
             target_selector=request.target_selector
         )
         
@@ -72,10 +117,17 @@ async def scrape_endpoint(request: ScrapeRequest) -> ScrapeResponse:
              logger.error(f"Scraper returned empty content for {request.url}")
              raise HTTPException(status_code=404, detail="No content retrieved from browser")
 
-        clean_html: str = HTMLCleaner.clean_html(raw_html, request.remove_selector)
-        logger.info(f"Cleaned HTML Length: {len(clean_html)}")
-        
-        markdown_text: str = HTMLCleaner.to_markdown(clean_html, request.include_images)
+        if use_profile:
+            markdown_text: str = profile_store.extract_markdown(
+                str(request.url),
+                raw_html,
+                request.include_images,
+                remove_selector=request.remove_selector,
+                wait_for_selector=request.wait_for_selector
+            )
+        else:
+            content, _ = HTMLCleaner.extract_content_node(raw_html, request.remove_selector)
+            markdown_text = HTMLCleaner.to_markdown(content, request.include_images)
         logger.info(f"Final Markdown Length: {len(markdown_text)}")
         
         if not markdown_text.strip():
@@ -86,7 +138,7 @@ async def scrape_endpoint(request: ScrapeRequest) -> ScrapeResponse:
             logger.info("Generating summary...")
             summary_text = local_summarizer.summarize_text(markdown_text)
 
-        return ScrapeResponse(
+        return negotiated_response(http_request, ScrapeResponse(
             url=str(request.url),
             title=title,
             markdown_content=markdown_text,
@@ -95,7 +147,7 @@ async def scrape_endpoint(request: ScrapeRequest) -> ScrapeResponse:
                 "original_length": len(raw_html),
                 "cleaned_length": len(markdown_text)
             }
-        )
+        ))
         
     except HTTPException as e:
         raise e
@@ -104,7 +156,8 @@ async def scrape_endpoint(request: ScrapeRequest) -> ScrapeResponse:
         raise HTTPException(status_code=500, detail=f"Scrape failed: {e}")
 
 @app.post("/map", response_model=MapResponse)
-async def map_endpoint(request: MapRequest) -> MapResponse:
+async def map_endpoint(request: MapRequest, http_request: Request) -> MapResponse:
+    _bind_client(http_request, PRIORITY_INTERACTIVE)
     try:
         logger.info(f"Received map request for: {request.url}")
         
@@ -117,13 +170,17 @@ async def map_endpoint(request: MapRequest) -> MapResponse:
             url=str(request.url),
             links=links
         )
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.exception(f"Map failed: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to map URL: {e}")
 
 @app.post("/crawl", response_model=CrawlResponse)
-async def crawl_endpoint(request: CrawlRequest) -> CrawlResponse:
+async def crawl_endpoint(request: CrawlRequest, http_request: Request) -> Union[CrawlResponse, Response]:
+    client_id: str = _bind_client(http_request, PRIORITY_CRAWL)
     try:
+        scraper_service.scheduler.check_admission(client_id)
         logger.info(f"Starting crawl request for: {request.url}")
         
         results_from_scraper: List[Tuple[str, Optional[str], Optional[str]]] = await scraper_service.crawl_site(
@@ -139,8 +196,7 @@ async def crawl_endpoint(request: CrawlRequest) -> CrawlResponse:
                 logger.warning(f"No content for {page_url}, skipping.")
                 continue
 
-            clean_html: str = HTMLCleaner.clean_html(raw_html)
-            markdown_text: str = HTMLCleaner.to_markdown(clean_html, request.include_images)
+            markdown_text: str = _extract_markdown(page_url, raw_html, request.include_images, request.use_profile)
             
             processed_results.append(ScrapeResponse(
                 url=page_url,
@@ -152,11 +208,11 @@ async def crawl_endpoint(request: CrawlRequest) -> CrawlResponse:
                 }
             ))
 
-        return CrawlResponse(
+        return negotiated_response(http_request, CrawlResponse(
             base_url=str(request.url),
             pages_crawled=len(processed_results),
             results=processed_results
-        )
+        ))
 
     except HTTPException as e:
         raise e
@@ -165,7 +221,8 @@ async def crawl_endpoint(request: CrawlRequest) -> CrawlResponse:
         raise HTTPException(status_code=500, detail=f"Crawl failed: {e}")
 
 @app.post("/map", response_model=MapResponse)
-async def map_endpoint(request: MapRequest) -> MapResponse:
+async def map_endpoint(request: MapRequest, http_request: Request) -> MapResponse:
+    _bind_client(http_request, PRIORITY_INTERACTIVE)
     try:
         logger.info(f"Received map request for: {request.url}")
         
@@ -178,19 +235,49 @@ async def map_endpoint(request: MapRequest) -> MapResponse:
             url=str(request.url),
             links=links
         )
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.exception(f"Map failed: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to map URL: {e}")
 
 @app.post("/scrape/batch")
-async def batch_scrape_endpoint(request: BatchScrapeRequest) -> StreamingResponse:
+async def batch_scrape_endpoint(request: BatchScrapeRequest, http_request: Request) -> StreamingResponse:
+    client_id: str = _bind_client(http_request, PRIORITY_BATCH)
     try:
-        tasks = [
-            scraper_service.scrape_url(str(url), formats=["markdown"], wait_for_selector=request.wait_for_selector)
-            for url in request.urls
-        ]
+        scraper_service.scheduler.check_admission(client_id)
+
+        # Keep at most one slot's worth of URLs queued per batch so a large batch
+        # cannot fill the scheduler queue on its own.
+        fan_out: asyncio.Semaphore = asyncio.Semaphore(scraper_service.scheduler.max_concurrency)
+
+        # URLs waiting on fan_out are reported as pending_batch in the queue stats.
+        not_started: int = len(request.urls)
+
+        async def scrape_one(url: str) -> Dict[str, Optional[str]]:
+            nonlocal not_started
+            try:
+                await fan_out.acquire()
+            finally:
+                not_started -= 1
+                scraper_service.scheduler.release_pending(client_id)
+            try:
+                return await scraper_service.scrape_url(
+                    url,
+                    formats=["markdown"],
+                    wait_for_selector=request.wait_for_selector or (profile_store.readiness_selector_for(url) if request.use_profile else None)
+                )
+            finally:
+                fan_out.release()
+
+        scraper_service.scheduler.hold_pending(client_id, not_started)
+        tasks = [scrape_one(str(url)) for url in request.urls]
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            if not_started:
+                scraper_service.scheduler.release_pending(client_id, not_started)
         
         zip_buffer = io.BytesIO()
         with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED, False) as zip_file:
@@ -208,8 +295,7 @@ async def batch_scrape_endpoint(request: BatchScrapeRequest) -> StreamingRespons
                 
                 raw_html: str = result["content"]
                 if raw_html:
-                    clean_html: str = HTMLCleaner.clean_html(raw_html)
-                    markdown: str = HTMLCleaner.to_markdown(clean_html, request.include_images)
+                    markdown: str = _extract_markdown(url, raw_html, request.include_images, request.use_profile)
                     
                     file_content: str = f"---\nurl: {url}\ntitle: {title}\n---\n\n{markdown}"
                     zip_file.writestr(filename, file_content)
@@ -230,7 +316,8 @@ async def batch_scrape_endpoint(request: BatchScrapeRequest) -> StreamingRespons
         raise HTTPException(status_code=500, detail=f"Batch scrape failed: {e}")
 
 @app.post("/search", response_model=SearchResponse)
-async def search_endpoint(request: SearchRequest) -> SearchResponse:
+async def search_endpoint(request: SearchRequest, http_request: Request) -> Union[SearchResponse, Response]:
+    _bind_client(http_request, PRIORITY_INTERACTIVE)
     try:
         urls: List[str] = [] 
         
@@ -252,8 +339,7 @@ async def search_endpoint(request: SearchRequest) -> SearchResponse:
             if not raw_html:
                 continue
 
-            clean_html: str = HTMLCleaner.clean_html(raw_html)
-            markdown_text: str = HTMLCleaner.to_markdown(clean_html, request.include_images)
+            markdown_text: str = _extract_markdown(url, raw_html, request.include_images, request.use_profile)
             
             processed_results.append(ScrapeResponse(
                 url=url,
@@ -267,11 +353,11 @@ async def search_endpoint(request: SearchRequest) -> SearchResponse:
             
             combined_markdown += f"## Source: [{title}]({url})\n\n{markdown_text}\n\n---\n\n"
             
-        return SearchResponse(
+        return negotiated_response(http_request, SearchResponse(
             query=request.query,
             results=processed_results,
             combined_markdown=combined_markdown
-        )
+        ))
         
     except HTTPException as e:
         raise e
@@ -279,6 +365,88 @@ async def search_endpoint(request: SearchRequest) -> SearchResponse:
         logger.exception(f"Search failed: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to search: {e}")
 
+async def _artifact_response(url: str, data: bytes, extension: str, spool: bool) -> Union[Response, ArtifactResponse]:
+    content_type: str = ArtifactSpool.CONTENT_TYPES[extension]
+    if spool:
+        handle: str = await asyncio.to_thread(artifact_spool.save, data, extension)
+        logger.info(f"Spooled {len(data)} byte {extension} artifact as {handle}")
+        return ArtifactResponse(url=url, handle=handle, content_type=content_type, size_bytes=len(data))
+
+    return Response(
+        content=data,
+        media_type=content_type,
+        headers={"Content-Disposition": f"inline; filename=capture.{extension}"}
+    )
+
+@app.post("/screenshot", response_model=None)
+async def screenshot_endpoint(request: ScreenshotRequest, http_request: Request) -> Union[Response, ArtifactResponse]:
+    _bind_client(http_request, PRIORITY_INTERACTIVE)
+    try:
+        logger.info(f"Received screenshot request for: {request.url}")
+
+        image_bytes: bytes = await scraper_service.capture_screenshot(
+            str(request.url),
+            wait_for_selector=request.wait_for_selector,
+            image_format=request.image_format,
+            quality=request.quality,
+            full_page=request.full_page,
+            clip=request.clip.model_dump() if request.clip else None,
+            viewport={"width": request.viewport_width, "height": request.viewport_height}
+        )
+
+        return await _artifact_response(str(request.url), image_bytes, request.image_format, request.spool)
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.exception(f"Screenshot failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Screenshot failed: {e}")
+
+@app.post("/pdf", response_model=None)
+async def pdf_endpoint(request: PdfRequest, http_request: Request) -> Union[Response, ArtifactResponse]:
+    _bind_client(http_request, PRIORITY_INTERACTIVE)
+    try:
+        logger.info(f"Received PDF request for: {request.url}")
+
+        pdf_bytes: bytes = await scraper_service.capture_pdf(
+            str(request.url),
+            wait_for_selector=request.wait_for_selector,
+            paper_format=request.paper_format,
+            print_background=request.print_background,
+            viewport={"width": request.viewport_width, "height": request.viewport_height}
+        )
+
+        return await _artifact_response(str(request.url), pdf_bytes, "pdf", request.spool)
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.exception(f"PDF generation failed: {e}")
+        raise HTTPException(status_code=500, detail=f"PDF generation failed: {e}")
+
+@app.get("/artifacts/{handle}")
+async def artifact_endpoint(handle: str) -> FileResponse:
+    path: Optional[str] = artifact_spool.path_for(handle)
+    if not path:
+        raise HTTPException(status_code=404, detail="Artifact not found or expired")
+
+    return FileResponse(path, media_type=artifact_spool.content_type_for(handle), filename=handle)
+
+@app.get("/profiles")
+async def profiles_endpoint() -> Dict[str, Any]:
+    return {key: profile.model_dump() for key, profile in profile_store.profiles.items()}
+
+@app.get("/queue")
+async def queue_stats_endpoint() -> Dict[str, Any]:
+    return scraper_service.scheduler.stats()
+
+@app.get("/metrics")
+async def metrics_endpoint() -> Dict[str, Any]:
+    return {
+        "queue": scraper_service.scheduler.stats(),
+        "encoding": encoding_metrics.stats()
+    }
+
 @app.get("/health")
 async def health_check() -> Dict[str, str]:
     return {"status": "ok"}
@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Optional, List, Literal
 from pydantic import BaseModel, HttpUrl, Field
 
 class ScrapeRequest(BaseModel):
@@ -23,6 +23,10 @@ class ScrapeRequest(BaseModel):
         default=False,
         description="If true, generates an extractive summary of the content."
     )
+    use_profile: bool = Field(
+        default=True,
+        description="If true, reuses the learned extraction profile for this domain and path. Ignored when target_selector is set."
+    )
 
 class ScrapeResponse(BaseModel):
     url: str
@@ -44,6 +48,10 @@ class CrawlRequest(BaseModel):
     max_pages: int = Field(default=5, ge=1, le=20, description="Max number of pages to scrape. Limit 20.")
     wait_for_selector: Optional[str] = None
     include_images: bool = False
+    use_profile: bool = Field(
+        default=True,
+        description="If true, reuses the learned extraction profile for each page's domain and path."
+    )
 
 class CrawlResponse(BaseModel):
     base_url: str
@@ -53,6 +61,10 @@ class SearchRequest(BaseModel):
     query: str
     limit: int = Field(default=3, ge=1, le=5, description="Number of results to scrape.")
     include_images: bool = False
+    use_profile: bool = Field(
+        default=True,
+        description="If true, reuses the learned extraction profile for each page's domain and path."
+    )
 
 class SearchResponse(BaseModel):
     query: str
@@ -62,4 +74,61 @@ class SearchResponse(BaseModel):
 class BatchScrapeRequest(BaseModel):
     urls: List[HttpUrl]
     wait_for_selector: Optional[str] = None
-    include_images: bool = False
\ No newline at end of file
+    include_images: bool = False
+    use_profile: bool = Field(
+        default=True,
+        description="If true, reuses the learned extraction profile for each page's domain and path."
+    )
+
+class ClipRegion(BaseModel):
+    x: float = Field(default=0, ge=0)
+    y: float = Field(default=0, ge=0)
+    width: float = Field(gt=0)
+    height: float = Field(gt=0)
+
+class ScreenshotRequest(BaseModel):
+    url: HttpUrl
+    wait_for_selector: Optional[str] = None
+    image_format: Literal["png", "jpeg"] = Field(
+        default="png",
+        description="Image encoding. JPEG is considerably smaller and cheaper to encode for large pages."
+    )
+    quality: Optional[int] = Field(
+        default=None, ge=1, le=100,
+        description="JPEG quality. Ignored for PNG."
+    )
+    full_page: bool = Field(
+        default=True,
+        description="Capture the full scrollable page instead of just the viewport. Ignored when clip is set."
+    )
+    clip: Optional[ClipRegion] = Field(
+        default=None,
+        description="Only capture this region of the page."
+    )
+    viewport_width: int = Field(default=1920, ge=320, le=3840)
+    viewport_height: int = Field(default=1080, ge=240, le=2160)
+    spool: bool = Field(
+        default=False,
+        description="If true, writes the capture to the spool directory and returns a handle instead of the bytes."
+    )
+
+class PdfRequest(BaseModel):
+    url: HttpUrl
+    wait_for_selector: Optional[str] = None
+    paper_format: Literal["Letter", "Legal", "Tabloid", "Ledger", "A0", "A1", "A2", "A3", "A4", "A5", "A6"] = Field(
+        default="A4",
+        description="Paper format supported by Chromium's PDF printer."
+    )
+    print_background: bool = True
+    viewport_width: int = Field(default=1920, ge=320, le=3840)
+    viewport_height: int = Field(default=1080, ge=240, le=2160)
+    spool: bool = Field(
+        default=False,
+        description="If true, writes the PDF to the spool directory and returns a handle instead of the bytes."
+    )
+
+class ArtifactResponse(BaseModel):
+    url: str
+    handle: str
+    content_type: str
+    size_bytes: int
\ No newline at end of file
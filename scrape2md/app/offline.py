@@ -0,0 +1,337 @@
+import os
+import re
+import gzip
+import html
+import json
+import zlib
+import time
+import hashlib
+import tarfile
+import logging
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Iterator, List, Optional, Dict, Any, Set, Tuple, IO
+from app.cleaner import HTMLCleaner
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger("uvicorn")
+
+HTML_EXTENSIONS: Tuple[str, ...] = ('.html', '.htm', '.xhtml', '.html.gz', '.htm.gz')
+WARC_EXTENSIONS: Tuple[str, ...] = ('.warc', '.warc.gz')
+TAR_EXTENSIONS: Tuple[str, ...] = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+# (record_id, url, raw bytes, charset, content encoding)
+Record = Tuple[str, Optional[str], bytes, Optional[str], Optional[str]]
+
+_summarizer = None
+
+def _open_maybe_gzip(path: str) -> IO[bytes]:
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+def _charset_from_content_type(content_type: str) -> Optional[str]:
+    match = re.search(r'charset=["\']?([\w.-]+)', content_type, re.IGNORECASE)
+    return match.group(1) if match else None
+
+def _dechunk(body: bytes) -> bytes:
+    chunks = []
+    pos: int = 0
+    while pos < len(body):
+        line_end: int = body.find(b'\r\n', pos)
+        if line_end == -1:
+            break
+        try:
+            size: int = int(body[pos:line_end].split(b';')[0], 16)
+        except ValueError:
+            return body
+        if size == 0:
+            break
+        chunks.append(body[line_end + 2:line_end + 2 + size])
+        pos = line_end + 2 + size + 2
+    return b''.join(chunks)
+
+def _split_http_response(payload: bytes) -> Tuple[Dict[str, str], bytes]:
+    header_end: int = payload.find(b'\r\n\r\n')
+    if header_end == -1:
+        return {}, payload
+
+    headers: Dict[str, str] = {}
+    for line in payload[:header_end].split(b'\r\n')[1:]:
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    body: bytes = payload[header_end + 4:]
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        body = _dechunk(body)
+    return headers, body
+
+def _decode_body(body: bytes, content_encoding: Optional[str]) -> bytes:
+    """Undoes the Content-Encoding of an archived response, raising ValueError when it cannot."""
+    codings: List[str] = [c.strip() for c in (content_encoding or '').lower().split(',') if c.strip()]
+    for coding in reversed(codings):
+        if coding == 'identity':
+            continue
+        if coding == 'br' and brotli is None:
+            raise ValueError("Body is brotli-compressed but the brotli package is not installed")
+        if coding not in ('gzip', 'x-gzip', 'deflate', 'br'):
+            raise ValueError(f"Unsupported content encoding: {coding}")
+        try:
+            if coding == 'br':
+                body = brotli.decompress(body)
+            elif coding == 'deflate':
+                # Servers send both zlib-wrapped and raw deflate streams under this name.
+                try:
+                    body = zlib.decompress(body)
+                except zlib.error:
+                    body = zlib.decompress(body, -zlib.MAX_WBITS)
+            else:
+                body = gzip.decompress(body)
+        except Exception as e:
+            raise ValueError(f"Could not decode {coding} body: {e}") from e
+    return body
+
+def iter_warc_records(path: str) -> Iterator[Record]:
+    """Streams HTML responses out of a WARC file, one record at a time."""
+    with _open_maybe_gzip(path) as stream:
+        while True:
+            offset: int = stream.tell()
+            line: bytes = stream.readline()
+            if not line:
+                return
+            if not line.startswith(b'WARC/'):
+                continue
+
+            warc_headers: Dict[str, str] = {}
+            while True:
+                header_line: bytes = stream.readline()
+                if not header_line or header_line in (b'\r\n', b'\n'):
+                    break
+                name, _, value = header_line.decode('utf-8', 'replace').partition(':')
+                warc_headers[name.strip().lower()] = value.strip()
+
+            payload: bytes = stream.read(int(warc_headers.get('content-length', 0)))
+            record_type: str = warc_headers.get('warc-type', '')
+            content_type: str = warc_headers.get('content-type', '')
+            url: Optional[str] = warc_headers.get('warc-target-uri')
+            record_id: str = warc_headers.get('warc-record-id', '').strip('<>') or url or f"{path}#{offset}"
+
+            if record_type == 'response' and 'application/http' in content_type:
+                http_headers, body = _split_http_response(payload)
+                body_type: str = http_headers.get('content-type', '')
+                if 'html' not in body_type.lower():
+                    continue
+                yield record_id, url, body, _charset_from_content_type(body_type), http_headers.get('content-encoding')
+            elif record_type == 'resource' and 'html' in content_type.lower():
+                yield record_id, url, payload, _charset_from_content_type(content_type), None
+
+def iter_tar_records(path: str) -> Iterator[Record]:
+    with tarfile.open(path, 'r|*') as archive:
+        for member in archive:
+            if not member.isfile() or not member.name.lower().endswith(HTML_EXTENSIONS):
+                continue
+            handle = archive.extractfile(member)
+            if handle is None:
+                continue
+            data: bytes = handle.read()
+            if member.name.endswith('.gz'):
+                data = gzip.decompress(data)
+            yield f"{os.path.basename(path)}/{member.name}", None, data, None, None
+
+def iter_records(path: str) -> Iterator[Record]:
+    """Yields raw HTML records from a directory, WARC, tar archive or single HTML file."""
+    lower: str = path.lower()
+
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full_path: str = os.path.join(root, name)
+                if name.lower().endswith(WARC_EXTENSIONS + TAR_EXTENSIONS + HTML_EXTENSIONS):
+                    yield from iter_records(full_path)
+    elif lower.endswith(WARC_EXTENSIONS):
+        yield from iter_warc_records(path)
+    elif lower.endswith(TAR_EXTENSIONS):
+        yield from iter_tar_records(path)
+    elif lower.endswith(HTML_EXTENSIONS):
+        with _open_maybe_gzip(path) as f:
+            yield path, None, f.read(), None, None
+    else:
+        logger.warning(f"Skipping unsupported input: {path}")
+
+def _init_worker(summarize: bool) -> None:
+    global _summarizer
+    if summarize:
+        from app.summarizer import LocalSummarizer
+        _summarizer = LocalSummarizer()
+
+def convert_record(record: Record, include_images: bool = False) -> Dict[str, Any]:
+    record_id, url, raw, charset, content_encoding = record
+    raw = _decode_body(raw, content_encoding)
+    if not charset:
+        meta_match = re.search(rb'<meta[^>]+charset=["\']?([\w.-]+)', raw[:4096], re.IGNORECASE)
+        charset = meta_match.group(1).decode('ascii') if meta_match else 'utf-8'
+    try:
+        raw_html: str = raw.decode(charset, errors='replace')
+    except LookupError:
+        raw_html = raw.decode('utf-8', errors='replace')
+
+    title_match = re.search(r'<title[^>]*>(.*?)</title>', raw_html, re.IGNORECASE | re.DOTALL)
+    title: Optional[str] = html.unescape(title_match.group(1)).strip() if title_match else None
+
+    content, _ = HTMLCleaner.extract_content_node(raw_html)
+    markdown_text: str = HTMLCleaner.to_markdown(content, include_images)
+
+    return {
+        "id": record_id,
+        "url": url,
+        "title": title,
+        "markdown_content": markdown_text,
+        "summary": _summarizer.summarize_text(markdown_text) if _summarizer else None,
+        "metadata": {
+            "original_length": len(raw_html),
+            "cleaned_length": len(markdown_text)
+        }
+    }
+
+def _convert_safely(record: Record, include_images: bool) -> Dict[str, Any]:
+    try:
+        return convert_record(record, include_images)
+    except Exception as e:
+        return {"id": record[0], "url": record[1], "error": str(e), "input_bytes": len(record[2])}
+
+class BulkConverter:
+    """
+    Converts archived HTML to Markdown across a process pool.
+    Converted records are checkpointed by id so an interrupted run can resume
+    without redoing them, while failed records are retried.
+    """
+
+    def __init__(
+        self,
+        output: str,
+        output_format: str = "jsonl",
+        workers: Optional[int] = None,
+        include_images: bool = False,
+        summarize: bool = False,
+        progress_path: Optional[str] = None,
+        report_every: float = 10.0
+    ):
+        self.output: str = output
+        self.output_format: str = output_format
+        self.workers: int = workers or os.cpu_count() or 1
+        self.include_images: bool = include_images
+        self.summarize: bool = summarize
+        self.progress_path: str = progress_path or f"{output.rstrip(os.sep)}.progress"
+        self.report_every: float = report_every
+
+        self.converted: int = 0
+        self.failed: int = 0
+        self.skipped: int = 0
+        self.input_bytes: int = 0
+        self.started_at: float = 0.0
+
+    def _load_progress(self) -> Set[str]:
+        try:
+            with open(self.progress_path, 'r', encoding='utf-8') as f:
+                return {line.rstrip('\n') for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+
+    def _markdown_path(self, result: Dict[str, Any]) -> str:
+        record_id: str = result["id"]
+        safe_name: str = re.sub(r'[^A-Za-z0-9._-]+', '_', os.path.splitext(record_id)[0]).strip('_')[-100:] or "page"
+        digest: str = hashlib.sha1(record_id.encode('utf-8')).hexdigest()[:10]
+        return os.path.join(self.output, f"{safe_name}_{digest}.md")
+
+    def _write(self, result: Dict[str, Any], jsonl_out: Optional[IO[str]]) -> None:
+        if jsonl_out is not None:
+            jsonl_out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            return
+
+        if "error" in result:
+            return
+        front_matter: str = f"---\nurl: {result['url'] or ''}\ntitle: {result['title'] or ''}\n---\n\n"
+        with open(self._markdown_path(result), 'w', encoding='utf-8') as f:
+            f.write(front_matter + result["markdown_content"])
+
+    def _report(self, final: bool = False) -> None:
+        elapsed: float = max(time.monotonic() - self.started_at, 1e-9)
+        processed: int = self.converted + self.failed
+        logger.info(
+            f"{'Finished' if final else 'Progress'}: {processed} records "
+            f"({self.converted} converted, {self.failed} failed, {self.skipped} skipped) in {elapsed:.1f}s, "
+            f"{processed / elapsed:.1f} records/s, {self.input_bytes / elapsed / 1e6:.2f} MB/s"
+        )
+
+    def run(self, inputs: List[str]) -> Dict[str, Any]:
+        done_ids: Set[str] = self._load_progress()
+        if done_ids:
+            logger.info(f"Resuming: {len(done_ids)} records already converted")
+
+        jsonl_out: Optional[IO[str]] = None
+        if self.output_format == "jsonl":
+            os.makedirs(os.path.dirname(os.path.abspath(self.output)), exist_ok=True)
+            jsonl_out = open(self.output, 'a', encoding='utf-8')
+        else:
+            os.makedirs(self.output, exist_ok=True)
+
+        self.started_at = time.monotonic()
+        last_report: float = self.started_at
+        max_in_flight: int = self.workers * 4
+        in_flight: Set[Future] = set()
+
+        try:
+            with open(self.progress_path, 'a', encoding='utf-8') as progress, \
+                 ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.summarize,)) as pool:
+
+                def drain(block_until: int) -> None:
+                    nonlocal in_flight
+                    while len(in_flight) > block_until:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            result: Dict[str, Any] = future.result()
+                            self._write(result, jsonl_out)
+                            if "error" in result:
+                                # Failures are left out of the checkpoint so a resumed run retries them.
+                                logger.warning(f"Failed to convert {result['id']}: {result['error']}")
+                                self.failed += 1
+                            else:
+                                progress.write(result["id"] + "\n")
+                                self.converted += 1
+                    if jsonl_out is not None:
+                        jsonl_out.flush()
+                    progress.flush()
+
+                for path in inputs:
+                    for record in iter_records(path):
+                        if record[0] in done_ids:
+                            self.skipped += 1
+                            continue
+                        self.input_bytes += len(record[2])
+                        in_flight.add(pool.submit(_convert_safely, record, self.include_images))
+
+                        if len(in_flight) >= max_in_flight:
+                            drain(max_in_flight // 2)
+
+                        if time.monotonic() - last_report >= self.report_every:
+                            self._report()
+                            last_report = time.monotonic()
+
+                drain(0)
+        finally:
+            if jsonl_out is not None:
+                jsonl_out.close()
+
+        self._report(final=True)
+        elapsed: float = time.monotonic() - self.started_at
+        return {
+            "converted": self.converted,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "seconds": round(elapsed, 2),
+            "records_per_second": round((self.converted + self.failed) / elapsed, 2) if elapsed else 0.0,
+        }
@@ -0,0 +1,167 @@
+import os
+import json
+import asyncio
+import time
+import tempfile
+import logging
+from urllib.parse import urlparse
+from pydantic import BaseModel
+from collections import OrderedDict
+from typing import Optional, Dict
+from app.cleaner import HTMLCleaner
+
+logger = logging.getLogger("uvicorn")
+
+class ExtractionProfile(BaseModel):
+    content_selector: Optional[str] = None
+    noise_selectors: Optional[str] = None
+    readiness_selector: Optional[str] = None
+    baseline_length: float = 0
+    hits: int = 0
+    relearn_count: int = 0
+    updated_at: float = 0
+
+class ProfileStore:
+    """
+    Remembers which extraction settings worked for a domain and path pattern
+    so repeat visits can skip selector probing in HTMLCleaner.
+    The least recently used profiles are evicted beyond max_profiles.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        drift_ratio: float = 0.25,
+        min_learn_length: int = 200,
+        max_profiles: int = 1000
+    ):
+        self.path: str = path or os.path.join(tempfile.gettempdir(), "scrape2md_profiles.json")
+        self.drift_ratio: float = drift_ratio
+        self.min_learn_length: int = min_learn_length
+        self.max_profiles: int = max_profiles
+        self.profiles: "OrderedDict[str, ExtractionProfile]" = OrderedDict()
+        self._pending_updates: int = 0
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw: dict = json.load(f)
+            self.profiles = OrderedDict((key, ExtractionProfile(**value)) for key, value in raw.items())
+            self._evict()
+            logger.info(f"Loaded {len(self.profiles)} extraction profiles from {self.path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not load extraction profiles from {self.path}: {e}")
+
+    def _snapshot(self) -> Dict[str, dict]:
+        self._pending_updates = 0
+        return {key: profile.model_dump() for key, profile in self.profiles.items()}
+
+    def _write(self, snapshot: Dict[str, dict]) -> None:
+        tmp_path: str = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self._pending_updates += 1
+            logger.warning(f"Could not save extraction profiles to {self.path}: {e}")
+
+    def flush(self) -> None:
+        if self._pending_updates:
+            self._write(self._snapshot())
+
+    async def flush_periodically(self, interval: float = 30.0) -> None:
+        """Writes pending updates in the background, at most once per interval."""
+        while True:
+            await asyncio.sleep(interval)
+            if self._pending_updates:
+                await asyncio.to_thread(self._write, self._snapshot())
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        parsed = urlparse(url)
+        # hostname is lowercased and excludes any port or credentials.
+        domain: str = (parsed.hostname or '').removeprefix('www.')
+        segments = [s for s in parsed.path.split('/') if s]
+
+        if not segments:
+            return f"{domain}/"
+
+        head: str = '*' if segments[0].isdigit() else segments[0]
+        if len(segments) == 1:
+            return f"{domain}/{head}"
+        return f"{domain}/{head}/*"
+
+    def get(self, url: str) -> Optional[ExtractionProfile]:
+        return self.profiles.get(self.key_for(url))
+
+    def readiness_selector_for(self, url: str) -> Optional[str]:
+        profile: Optional[ExtractionProfile] = self.get(url)
+        return profile.readiness_selector if profile else None
+
+    def _mark_updated(self) -> None:
+        self._pending_updates += 1
+
+    def _evict(self) -> None:
+        while len(self.profiles) > self.max_profiles:
+            self.profiles.popitem(last=False)
+
+    def _drifted(self, profile: ExtractionProfile, length: int) -> bool:
+        return length < profile.baseline_length * self.drift_ratio or length > profile.baseline_length / self.drift_ratio
+
+    def extract_markdown(
+        self,
+        url: str,
+        raw_html: str,
+        include_images: bool = False,
+        remove_selector: Optional[str] = None,
+        wait_for_selector: Optional[str] = None
+    ) -> str:
+        key: str = self.key_for(url)
+        profile: Optional[ExtractionProfile] = self.profiles.get(key)
+        noise_selectors: Optional[str] = remove_selector or (profile.noise_selectors if profile else None)
+
+        if profile:
+            content, selector = HTMLCleaner.extract_content_node(raw_html, noise_selectors, profile.content_selector)
+            markdown_text: str = HTMLCleaner.to_markdown(content, include_images)
+            length: int = len(markdown_text)
+
+            if selector == profile.content_selector and not self._drifted(profile, length):
+                profile.hits += 1
+                self.profiles.move_to_end(key)
+                profile.baseline_length = 0.9 * profile.baseline_length + 0.1 * length
+                self._mark_updated()
+                return markdown_text
+
+            logger.info(f"Extraction profile for {key} drifted (selector={selector}, length={length}), relearning")
+
+        # A missed profile selector already fell through to full probing, so only
+        # a length drift on the learned selector needs another pass.
+        if not profile or selector == profile.content_selector:
+            content, selector = HTMLCleaner.extract_content_node(raw_html, noise_selectors)
+            markdown_text = HTMLCleaner.to_markdown(content, include_images)
+
+        # Whole-page fallbacks and near-empty pages (interstitials, error pages)
+        # say nothing about where the content lives, so they are never learned.
+        if selector in (None, 'body') or len(markdown_text) < self.min_learn_length:
+            if profile:
+                del self.profiles[key]
+                self._mark_updated()
+            return markdown_text
+
+        self.profiles[key] = ExtractionProfile(
+            content_selector=selector,
+            noise_selectors=noise_selectors,
+            readiness_selector=wait_for_selector or (profile.readiness_selector if profile else None),
+            baseline_length=len(markdown_text),
+            hits=profile.hits if profile else 0,
+            relearn_count=profile.relearn_count + 1 if profile else 0,
+            updated_at=time.time()
+        )
+        self.profiles.move_to_end(key)
+        self._evict()
+        self._mark_updated()
+        return markdown_text
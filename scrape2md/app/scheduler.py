@@ -0,0 +1,239 @@
+import asyncio
+import math
+import time
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from fastapi import HTTPException
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("uvicorn")
+
+PRIORITY_INTERACTIVE: int = 0
+PRIORITY_CRAWL: int = 1
+PRIORITY_BATCH: int = 2
+
+PRIORITY_NAMES: List[str] = ["interactive", "crawl", "batch"]
+
+DEFAULT_QUEUE_TIMEOUTS: Dict[int, float] = {
+    PRIORITY_INTERACTIVE: 30.0,
+    PRIORITY_CRAWL: 120.0,
+    PRIORITY_BATCH: 300.0,
+}
+
+_binding: ContextVar[Tuple[int, str, Optional[float]]] = ContextVar(
+    "scheduler_binding", default=(PRIORITY_INTERACTIVE, "anonymous", None)
+)
+
+class AdmissionRejected(HTTPException):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+
+class _Waiter:
+    __slots__ = ("future", "client_id", "priority", "deadline", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, client_id: str, priority: int, deadline: float):
+        self.future: asyncio.Future = future
+        self.client_id: str = client_id
+        self.priority: int = priority
+        self.deadline: float = deadline
+        self.enqueued_at: float = time.monotonic()
+
+class RequestScheduler:
+    """
+    Admission control in front of the browser slots.
+
+    Waiters are served strictly by priority class and round-robin between
+    clients inside a class. Requests beyond the queue limits are rejected
+    immediately, and requests whose queue deadline has passed are never started.
+    Lower-priority waiters never hold queue space against a higher-priority
+    request: the newest of them is displaced when the queue is full.
+    """
+
+    def __init__(self, max_concurrency: int = 5, max_queue_depth: int = 100, max_client_queue_depth: int = 20):
+        self.max_concurrency: int = max_concurrency
+        self.max_queue_depth: int = max_queue_depth
+        self.max_client_queue_depth: int = max_client_queue_depth
+
+        self.active: int = 0
+        self.queued: int = 0
+        self.queued_by_priority: List[int] = [0 for _ in PRIORITY_NAMES]
+        self.client_queued: Dict[str, int] = {}
+        self.pending_batch: Dict[str, int] = {}
+        self.queues: List["OrderedDict[str, Deque[_Waiter]]"] = [OrderedDict() for _ in PRIORITY_NAMES]
+
+        self.admitted: int = 0
+        self.rejected: int = 0
+        self.expired: int = 0
+        self.displaced: int = 0
+        self.avg_wait_seconds: float = 0.0
+        self.avg_service_seconds: float = 1.0
+
+    def bind(self, priority: int, client_id: str, queue_timeout: Optional[float] = None) -> None:
+        """Tags the current request so every slot it acquires uses this class and client."""
+        _binding.set((priority, client_id, queue_timeout))
+
+    def retry_after(self) -> int:
+        backlog: int = self.queued + self.active
+        return max(1, math.ceil(backlog * self.avg_service_seconds / self.max_concurrency))
+
+    def check_admission(self, client_id: str, count: int = 1) -> None:
+        # Only waiters of the same or a higher priority count against the
+        # depth limit, since lower-priority ones can be displaced.
+        priority: int = _binding.get()[0]
+        if sum(self.queued_by_priority[:priority + 1]) + count > self.max_queue_depth:
+            self.rejected += 1
+            raise AdmissionRejected(503, "Server is at capacity, try again later", self.retry_after())
+        if self.client_queued.get(client_id, 0) + count > self.max_client_queue_depth:
+            self.rejected += 1
+            raise AdmissionRejected(429, "Too many queued requests for this client", self.retry_after())
+
+    def hold_pending(self, client_id: str, count: int) -> None:
+        """Counts batch URLs that are waiting for their turn before they reach the queue."""
+        self.pending_batch[client_id] = self.pending_batch.get(client_id, 0) + count
+
+    def release_pending(self, client_id: str, count: int = 1) -> None:
+        remaining: int = self.pending_batch.get(client_id, count) - count
+        if remaining > 0:
+            self.pending_batch[client_id] = remaining
+        else:
+            self.pending_batch.pop(client_id, None)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        priority, client_id, queue_timeout = _binding.get()
+        await self._acquire(priority, client_id, queue_timeout or DEFAULT_QUEUE_TIMEOUTS[priority])
+        started: float = time.monotonic()
+        try:
+            yield
+        finally:
+            self.avg_service_seconds = 0.9 * self.avg_service_seconds + 0.1 * (time.monotonic() - started)
+            self.active -= 1
+            self._dispatch()
+
+    async def _acquire(self, priority: int, client_id: str, queue_timeout: float) -> None:
+        if self.active < self.max_concurrency and not self.queued:
+            self.active += 1
+            self.admitted += 1
+            self._record_wait(0.0)
+            return
+
+        self.check_admission(client_id)
+        if self.queued >= self.max_queue_depth:
+            self._displace_below(priority)
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), client_id, priority, time.monotonic() + queue_timeout)
+        self.queues[priority].setdefault(client_id, deque()).append(waiter)
+        self.queued += 1
+        self.queued_by_priority[priority] += 1
+        self.client_queued[client_id] = self.client_queued.get(client_id, 0) + 1
+
+        # asyncio.wait rather than wait_for: on Python < 3.12 wait_for can swallow
+        # a cancellation that races with the slot being granted.
+        try:
+            done, _ = await asyncio.wait((waiter.future,), timeout=queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if not done:
+            self._abandon(waiter)
+            self.expired += 1
+            raise AdmissionRejected(503, "Request expired while queued", self.retry_after())
+        waiter.future.result()
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+            # The slot was granted as the wait gave up, so hand it to the next waiter.
+            self.active -= 1
+            self._dispatch()
+        else:
+            self._remove(waiter)
+            waiter.future.cancel()
+
+    def _remove(self, waiter: _Waiter) -> None:
+        queue = self.queues[waiter.priority]
+        client_waiters: Optional[Deque[_Waiter]] = queue.get(waiter.client_id)
+        if not client_waiters or waiter not in client_waiters:
+            return
+        client_waiters.remove(waiter)
+        if not client_waiters:
+            del queue[waiter.client_id]
+        self._dequeued(waiter)
+
+    def _displace_below(self, priority: int) -> None:
+        """Rejects the newest waiter of the lowest class below priority to make room."""
+        for lower in range(len(self.queues) - 1, priority, -1):
+            if not self.queues[lower]:
+                continue
+            newest: _Waiter = max((waiters[-1] for waiters in self.queues[lower].values()), key=lambda w: w.enqueued_at)
+            self._remove(newest)
+            self.displaced += 1
+            if not newest.future.done():
+                newest.future.set_exception(AdmissionRejected(503, "Displaced by higher priority requests", self.retry_after()))
+            return
+
+    def _dequeued(self, waiter: _Waiter) -> None:
+        self.queued -= 1
+        self.queued_by_priority[waiter.priority] -= 1
+        remaining: int = self.client_queued.get(waiter.client_id, 1) - 1
+        if remaining:
+            self.client_queued[waiter.client_id] = remaining
+        else:
+            self.client_queued.pop(waiter.client_id, None)
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        for queue in self.queues:
+            if not queue:
+                continue
+            client_id, client_waiters = next(iter(queue.items()))
+            waiter: _Waiter = client_waiters.popleft()
+            if client_waiters:
+                queue.move_to_end(client_id)
+            else:
+                del queue[client_id]
+            self._dequeued(waiter)
+            return waiter
+        return None
+
+    def _dispatch(self) -> None:
+        now: float = time.monotonic()
+        while self.active < self.max_concurrency:
+            waiter: Optional[_Waiter] = self._next_waiter()
+            if waiter is None:
+                return
+            if waiter.future.done():
+                continue
+            if waiter.deadline <= now:
+                self.expired += 1
+                waiter.future.set_exception(AdmissionRejected(503, "Request expired while queued", self.retry_after()))
+                continue
+
+            self.active += 1
+            self.admitted += 1
+            self._record_wait(now - waiter.enqueued_at)
+            waiter.future.set_result(None)
+
+    def _record_wait(self, waited: float) -> None:
+        self.avg_wait_seconds = 0.9 * self.avg_wait_seconds + 0.1 * waited
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "queued": self.queued,
+            "max_queue_depth": self.max_queue_depth,
+            "queued_by_priority": {
+                name: self.queued_by_priority[priority] for priority, name in enumerate(PRIORITY_NAMES)
+            },
+            "queued_by_client": dict(self.client_queued),
+            "pending_batch": sum(self.pending_batch.values()),
+            "pending_batch_by_client": dict(self.pending_batch),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "displaced": self.displaced,
+            "avg_wait_ms": round(self.avg_wait_seconds * 1000, 1),
+            "avg_service_ms": round(self.avg_service_seconds * 1000, 1),
+            "retry_after_seconds": self.retry_after(),
+        }
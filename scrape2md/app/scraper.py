@@ -3,9 +3,10 @@ import logging
 import base64
 from urllib.parse import urlparse, urljoin, urlunparse
 from playwright.async_api import async_playwright, Browser, Playwright, Page
-from typing import List, Dict, Optional, Tuple
+from typing import Any, List, Dict, Optional, Tuple
 from collections import deque
 from app.cleaner import HTMLCleaner
+from app.scheduler import RequestScheduler, AdmissionRejected
 
 logger = logging.getLogger("uvicorn")
 
@@ -13,7 +14,7 @@ class ScraperService:
     def __init__(self, max_concurrency: int = 5):
         self.playwright: Optional[Playwright] = None
         self.browser: Optional[Browser] = None
-        self.semaphore: asyncio.Semaphore = asyncio.Semaphore(max_concurrency)
+        self.scheduler: RequestScheduler = RequestScheduler(max_concurrency)
         self.user_agent: str = (
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
             "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -42,8 +43,25 @@ class ScraperService:
             await self.playwright.stop()
         logger.info("Playwright browser stopped.")
 
+    async def _load_page(self, page: Page, url: str, wait_for_selector: Optional[str] = None) -> None:
+        logger.info(f"Navigating to {url}")
+        await page.goto(url, timeout=30000, wait_until="domcontentloaded")
+        try:
+            await page.wait_for_load_state("networkidle", timeout=10000)
+        except Exception:
+            logger.warning("Network idle timeout, proceeding anyway...")
+        
+        await asyncio.sleep(2)
+
+        if wait_for_selector:
+            try:
+                logger.info(f"Waiting for selector: {wait_for_selector}")
+                await page.wait_for_selector(wait_for_selector, timeout=5000)
+            except Exception as e:
+                logger.warning(f"Timeout waiting for selector {wait_for_selector}: {e}")
+
     async def scrape_url(self, url: str, formats: List[str] = ["markdown"], wait_for_selector: Optional[str] = None, target_selector: Optional[str] = None) -> Dict[str, Optional[str]]:
-        async with self.semaphore:
+        async with self.scheduler.slot():
             context = await self.browser.new_context(
                 user_agent=self.user_agent,
                 viewport={"width": 1920, "height": 1080},
@@ -53,21 +71,7 @@ class ScraperService:
             page = await context.new_page()
             
             try:
-                logger.info(f"Navigating to {url}")
-                await page.goto(url, timeout=30000, wait_until="domcontentloaded")
-                try:
-                    await page.wait_for_load_state("networkidle", timeout=10000)
-                except Exception:
-                    logger.warning("Network idle timeout, proceeding anyway...")
-                
-                await asyncio.sleep(2)
-
-                if wait_for_selector:
-                    try:
-                        logger.info(f"Waiting for selector: {wait_for_selector}")
-                        await page.wait_for_selector(wait_for_selector, timeout=5000)
-                    except Exception as e:
-                        logger.warning(f"Timeout waiting for selector {wait_for_selector}: {e}")
+                await self._load_page(page, url, wait_for_selector)
 
                 result: Dict[str, Optional[str]] = {
                     "title": await page.title(),
@@ -115,8 +119,77 @@ class ScraperService:
                 await page.close()
                 await context.close()
 
+    async def capture_screenshot(
+        self,
+        url: str,
+        wait_for_selector: Optional[str] = None,
+        image_format: str = "png",
+        quality: Optional[int] = None,
+        full_page: bool = True,
+        clip: Optional[Dict[str, float]] = None,
+        viewport: Optional[Dict[str, int]] = None
+    ) -> bytes:
+        async with self.scheduler.slot():
+            context = await self.browser.new_context(
+                user_agent=self.user_agent,
+                viewport=viewport or {"width": 1920, "height": 1080},
+                java_script_enabled=True
+            )
+            page = await context.new_page()
+
+            try:
+                await self._load_page(page, url, wait_for_selector)
+
+                options: Dict[str, Any] = {"type": image_format}
+                if image_format == "jpeg" and quality is not None:
+                    options["quality"] = quality
+                if clip:
+                    options["clip"] = clip
+                else:
+                    options["full_page"] = full_page
+
+                logger.info(f"Capturing {image_format} screenshot of {url}")
+                return await page.screenshot(**options)
+
+            except Exception as e:
+                logger.error(f"Error capturing screenshot of {url}: {e}")
+                raise e
+            finally:
+                await page.close()
+                await context.close()
+
+    async def capture_pdf(
+        self,
+        url: str,
+        wait_for_selector: Optional[str] = None,
+        paper_format: str = "A4",
+        print_background: bool = True,
+        viewport: Optional[Dict[str, int]] = None
+    ) -> bytes:
+        async with self.scheduler.slot():
+            context = await self.browser.new_context(
+                user_agent=self.user_agent,
+                viewport=viewport or {"width": 1920, "height": 1080},
+                java_script_enabled=True
+            )
+            page = await context.new_page()
+
+            try:
+                await self._load_page(page, url, wait_for_selector)
+
+                logger.info(f"Generating PDF of {url}")
+                await page.emulate_media(media="screen")
+                return await page.pdf(format=paper_format, print_background=print_background)
+
+            except Exception as e:
+                logger.error(f"Error generating PDF of {url}: {e}")
+                raise e
+            finally:
+                await page.close()
+                await context.close()
+
     async def map_site(self, url: str) -> List[str]:
-        async with self.semaphore:
+        async with self.scheduler.slot():
             context = await self.browser.new_context(user_agent=self.user_agent)
             page = await context.new_page()
             try:
@@ -237,6 +310,9 @@ class ScraperService:
                             if normalized_url not in visited:
                                 queue.append((normalized_url, depth + 1))
                             
+            except AdmissionRejected:
+                # A full queue fails the whole crawl fast instead of silently dropping pages.
+                raise
             except Exception as e:
                 logger.error(f"Failed to crawl {current_url}: {e}")
                 continue
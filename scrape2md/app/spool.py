@@ -0,0 +1,72 @@
+import os
+import re
+import asyncio
+import time
+import uuid
+import tempfile
+import logging
+from typing import Optional, Dict
+
+logger = logging.getLogger("uvicorn")
+
+class ArtifactSpool:
+    """Local directory for binary captures that are fetched later by handle."""
+
+    CONTENT_TYPES: Dict[str, str] = {
+        "png": "image/png",
+        "jpeg": "image/jpeg",
+        "pdf": "application/pdf",
+    }
+
+    HANDLE_PATTERN = re.compile(r'^[0-9a-f]{32}\.(png|jpeg|pdf)$')
+
+    def __init__(self, directory: Optional[str] = None, max_age_seconds: int = 3600):
+        self.directory: str = directory or os.path.join(tempfile.gettempdir(), "scrape2md_spool")
+        self.max_age_seconds: int = max_age_seconds
+        os.makedirs(self.directory, exist_ok=True)
+
+    def save(self, data: bytes, extension: str) -> str:
+        if extension not in self.CONTENT_TYPES:
+            raise ValueError(f"Unsupported artifact type: {extension}")
+
+        handle: str = f"{uuid.uuid4().hex}.{extension}"
+        tmp_path: str = os.path.join(self.directory, f".{handle}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(self.directory, handle))
+        return handle
+
+    def path_for(self, handle: str) -> Optional[str]:
+        if not self.HANDLE_PATTERN.match(handle):
+            return None
+        path: str = os.path.join(self.directory, handle)
+        try:
+            # Expired files may outlive their age until the next background purge.
+            if os.path.getmtime(path) < time.time() - self.max_age_seconds:
+                return None
+        except OSError:
+            return None
+        return path if os.path.isfile(path) else None
+
+    def content_type_for(self, handle: str) -> str:
+        return self.CONTENT_TYPES.get(handle.rsplit('.', 1)[-1], "application/octet-stream")
+
+    async def purge_periodically(self, interval: float = 300.0) -> None:
+        """Removes expired artifacts in the background, once per interval."""
+        while True:
+            await asyncio.to_thread(self.purge_expired)
+            await asyncio.sleep(interval)
+
+    def purge_expired(self) -> None:
+        cutoff: float = time.time() - self.max_age_seconds
+        try:
+            entries = os.scandir(self.directory)
+        except FileNotFoundError:
+            return
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except OSError as e:
+                    logger.warning(f"Could not purge spooled artifact {entry.name}: {e}")
@@ -0,0 +1,192 @@
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from typing import Callable, List, Tuple
+
+# Ensure the backend package is importable when run from anywhere
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.cleaner import HTMLCleaner
+
+GOLDEN_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+try:
+    from markdownify import markdownify
+except ImportError:
+    markdownify = None
+
+WORDS: List[str] = (
+    "the quick brown fox jumps over lazy dog markdown parser stream tree node "
+    "content article section browser render token model_name value *emphasis* "
+    "café naïve 2024 data pipeline"
+).split()
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+def _inline(rng: random.Random) -> str:
+    parts: List[str] = []
+    for _ in range(rng.randint(3, 8)):
+        choice: float = rng.random()
+        if choice < 0.55:
+            parts.append(_sentence(rng, rng.randint(4, 14)))
+        elif choice < 0.7:
+            parts.append(f'<a href="https://example.com/{rng.randint(1, 999)}">{_sentence(rng, 3)}</a>')
+        elif choice < 0.8:
+            parts.append(f"<strong>{_sentence(rng, 2)}</strong>")
+        elif choice < 0.88:
+            parts.append(f"<em>{_sentence(rng, 2)}</em>")
+        elif choice < 0.94:
+            parts.append(f"<code>{rng.choice(WORDS)}()</code>")
+        else:
+            parts.append(f'<img src="/img/{rng.randint(1, 99)}.png" alt="{rng.choice(WORDS)}">')
+    return " ".join(parts)
+
+def _block(rng: random.Random, depth: int = 0) -> str:
+    choice: float = rng.random()
+    if choice < 0.45:
+        return f"<p>{_inline(rng)}</p>\n"
+    if choice < 0.55:
+        level: int = rng.randint(2, 4)
+        return f"<h{level}>{_sentence(rng, 5)}</h{level}>\n"
+    if choice < 0.68:
+        tag: str = rng.choice(["ul", "ol"])
+        items: str = "".join(
+            f"<li>{_inline(rng)}{_block(rng, depth + 1) if depth < 2 and rng.random() < 0.2 else ''}</li>\n"
+            for _ in range(rng.randint(2, 7))
+        )
+        return f"<{tag}>\n{items}</{tag}>\n"
+    if choice < 0.75:
+        rows: str = "".join(
+            "<tr>" + "".join(f"<td>{_sentence(rng, 3)}</td>" for _ in range(4)) + "</tr>\n"
+            for _ in range(rng.randint(2, 8))
+        )
+        head: str = "<tr>" + "".join(f"<th>{rng.choice(WORDS)}</th>" for _ in range(4)) + "</tr>"
+        return f"<table><thead>{head}</thead><tbody>\n{rows}</tbody></table>\n"
+    if choice < 0.8:
+        return f"<pre><code>def f():\n    return {rng.randint(1, 99)}  # {_sentence(rng, 3)}\n</code></pre>\n"
+    if choice < 0.85:
+        return f"<blockquote><p>{_inline(rng)}</p></blockquote>\n"
+    if depth < 3:
+        inner: str = "".join(_block(rng, depth + 1) for _ in range(rng.randint(1, 4)))
+        return f'<div class="section">\n{inner}</div>\n'
+    return f"<p>{_inline(rng)}<br>{_inline(rng)}</p>\n"
+
+def synthetic_page(seed: int, blocks: int) -> str:
+    rng = random.Random(seed)
+    body: str = "".join(_block(rng) for _ in range(blocks))
+    return (
+        "<!DOCTYPE html><html><head><title>Page</title><script>var x = 1;</script></head><body>"
+        '<nav><a href="/">Home</a></nav><div class="cookie-banner">Accept cookies</div>'
+        f"<main><article><h1>{_sentence(rng, 6)}</h1>\n{body}</article></main>"
+        "<footer>Footer links</footer></body></html>"
+    )
+
+def legacy_to_markdown(content, include_images: bool) -> str:
+    markdown: str = markdownify(
+        str(content),
+        heading_style="ATX",
+        strip=['img'] if not include_images else []
+    )
+    return re.sub(r'\n\s*\n', '\n\n', markdown).strip()
+
+def check_golden(update: bool = False) -> List[str]:
+    """
+    Converts every golden/*.html page and compares it with the checked-in .md next to it.
+    Pages named *-images.html are converted with include_images.
+    """
+    mismatches: List[str] = []
+    for name in sorted(os.listdir(GOLDEN_DIR)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(GOLDEN_DIR, name), "r", encoding="utf-8") as f:
+            content, _ = HTMLCleaner.extract_content_node(f.read())
+        actual: str = HTMLCleaner.to_markdown(content, name.endswith("-images.html"))
+
+        expected_path: str = os.path.join(GOLDEN_DIR, name[:-len(".html")] + ".md")
+        if update:
+            with open(expected_path, "w", encoding="utf-8") as f:
+                f.write(actual)
+            continue
+        with open(expected_path, "r", encoding="utf-8") as f:
+            if f.read() != actual:
+                mismatches.append(name)
+    return mismatches
+
+def measure(convert: Callable[[], str]) -> Tuple[str, float, int]:
+    """Times the conversion, then repeats it under tracemalloc for its peak allocation."""
+    started: float = time.perf_counter()
+    output: str = convert()
+    elapsed: float = time.perf_counter() - started
+
+    tracemalloc.start()
+    convert()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return output, elapsed, peak
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the streaming Markdown converter against markdownify.")
+    parser.add_argument("files", nargs="*", help="Extra HTML files to add to the corpus.")
+    parser.add_argument("--pages", type=int, default=20, help="Number of synthetic pages. Default: 20.")
+    parser.add_argument("--blocks", type=int, default=200, help="Blocks per synthetic page. Default: 200.")
+    parser.add_argument("--include-images", action="store_true")
+    parser.add_argument("--update-golden", action="store_true", help="Rewrite the expected golden outputs from the current converter.")
+    args = parser.parse_args()
+
+    golden_mismatches: List[str] = check_golden(args.update_golden)
+    if args.update_golden:
+        print(f"Golden outputs rewritten in {GOLDEN_DIR}")
+        return
+    if golden_mismatches:
+        print(f"Output differs from the golden corpus for {len(golden_mismatches)} page(s): {', '.join(golden_mismatches)}")
+        sys.exit(1)
+    print("Output matches the golden corpus.")
+
+    if markdownify is None:
+        print("markdownify is not installed, skipping the timing comparison: pip install markdownify")
+        return
+
+    corpus: List[Tuple[str, str]] = [(f"synthetic-{i}", synthetic_page(i, args.blocks)) for i in range(args.pages)]
+    for path in args.files:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            corpus.append((path, f.read()))
+
+    legacy_time: float = 0.0
+    stream_time: float = 0.0
+    legacy_peaks: List[int] = []
+    stream_peaks: List[int] = []
+    mismatches: List[str] = []
+    total_chars: int = 0
+
+    for name, html in corpus:
+        content, _ = HTMLCleaner.extract_content_node(html)
+
+        expected, elapsed, peak = measure(lambda: legacy_to_markdown(content, args.include_images))
+        legacy_time += elapsed
+        legacy_peaks.append(peak)
+
+        actual, elapsed, peak = measure(lambda: HTMLCleaner.to_markdown(content, args.include_images))
+        stream_time += elapsed
+        stream_peaks.append(peak)
+
+        total_chars += len(actual)
+        if actual != expected:
+            mismatches.append(name)
+
+    print(f"Pages: {len(corpus)}, Markdown output: {total_chars / 1e6:.2f}M chars")
+    print(f"markdownify + regex: {legacy_time:.3f}s, peak memory avg {sum(legacy_peaks) / len(legacy_peaks) / 1e6:.2f} MB, max {max(legacy_peaks) / 1e6:.2f} MB")
+    print(f"streaming converter: {stream_time:.3f}s, peak memory avg {sum(stream_peaks) / len(stream_peaks) / 1e6:.2f} MB, max {max(stream_peaks) / 1e6:.2f} MB")
+    print(f"Speedup: {legacy_time / stream_time:.2f}x, peak memory reduction: {1 - max(stream_peaks) / max(legacy_peaks):.0%}")
+
+    if mismatches:
+        print(f"Output differs from markdownify for {len(mismatches)} page(s): {', '.join(mismatches[:10])}")
+        sys.exit(1)
+    print("Output identical to markdownify for every page.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import sys
+import os
+import json
+import logging
+import argparse
+
+# Ensure the current directory is in the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.offline import BulkConverter
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert archived HTML (WARC, tar, .html/.html.gz files or directories) to Markdown without a browser."
+    )
+    parser.add_argument("inputs", nargs="+", help="WARC files, tar archives, HTML files or directories to convert.")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file, or directory when --format markdown is used.")
+    parser.add_argument("--format", choices=["jsonl", "markdown"], default="jsonl", help="Output format. Default: jsonl.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes. Default: number of CPUs.")
+    parser.add_argument("--include-images", action="store_true", help="Preserve image links in the Markdown output.")
+    parser.add_argument("--summarize", action="store_true", help="Also generate an extractive summary for each page.")
+    parser.add_argument("--progress", default=None, help="Checkpoint file used to resume. Default: <output>.progress")
+    parser.add_argument("--report-every", type=float, default=10.0, help="Seconds between throughput reports.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    converter = BulkConverter(
+        args.output,
+        output_format=args.format,
+        workers=args.workers,
+        include_images=args.include_images,
+        summarize=args.summarize,
+        progress_path=args.progress,
+        report_every=args.report_every
+    )
+    stats = converter.run(args.inputs)
+    print(json.dumps(stats))
@@ -0,0 +1,12 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.profiles import ProfileStore
+
+def test_key_for_strips_only_leading_www_and_port():
+    assert ProfileStore.key_for("https://www.example.com/blog/post") == "example.com/blog/*"
+    assert ProfileStore.key_for("https://WWW.Example.com:8443/news") == "example.com/news"
+    assert ProfileStore.key_for("https://awww.example.com/") == "awww.example.com/"
+    assert ProfileStore.key_for("https://example.com/2024/01/slug") == "example.com/*/*"
@@ -0,0 +1,128 @@
+import os
+import sys
+import asyncio
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scheduler import RequestScheduler, AdmissionRejected, PRIORITY_INTERACTIVE, PRIORITY_BATCH
+
+async def _queue_request(scheduler: RequestScheduler, priority: int, client_id: str, release: asyncio.Event) -> None:
+    scheduler.bind(priority, client_id)
+    async with scheduler.slot():
+        await release.wait()
+
+async def _fill_with_batch_backlog(scheduler: RequestScheduler, release: asyncio.Event) -> list:
+    holder = asyncio.create_task(_queue_request(scheduler, PRIORITY_BATCH, "holder", release))
+    batch = [
+        asyncio.create_task(_queue_request(scheduler, PRIORITY_BATCH, f"batch-{i}", release))
+        for i in range(scheduler.max_queue_depth)
+    ]
+    await asyncio.sleep(0)
+    return [holder] + batch
+
+def test_interactive_admission_ignores_batch_backlog():
+    async def scenario():
+        scheduler = RequestScheduler(max_concurrency=1, max_queue_depth=5)
+        release = asyncio.Event()
+        tasks = await _fill_with_batch_backlog(scheduler, release)
+        assert scheduler.queued == 5
+
+        scheduler.bind(PRIORITY_INTERACTIVE, "interactive")
+        scheduler.check_admission("interactive")
+
+        interactive = [
+            asyncio.create_task(_queue_request(scheduler, PRIORITY_INTERACTIVE, f"interactive-{i}", release))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.queued == 5
+        assert scheduler.stats()["queued_by_priority"] == {"interactive": 3, "crawl": 0, "batch": 2}
+        assert scheduler.displaced == 3
+
+        release.set()
+        results = await asyncio.gather(*tasks, *interactive, return_exceptions=True)
+        displaced = [r for r in results if isinstance(r, AdmissionRejected)]
+        assert len(displaced) == 3 and all(r.status_code == 503 for r in displaced)
+        assert all(r is None for r in results[-3:])
+
+    asyncio.run(scenario())
+
+def test_batch_is_rejected_when_queue_is_full():
+    async def scenario():
+        scheduler = RequestScheduler(max_concurrency=1, max_queue_depth=5)
+        release = asyncio.Event()
+        tasks = await _fill_with_batch_backlog(scheduler, release)
+
+        scheduler.bind(PRIORITY_BATCH, "late")
+        with pytest.raises(AdmissionRejected) as rejected:
+            scheduler.check_admission("late")
+        assert rejected.value.status_code == 503
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+def test_interactive_is_rejected_when_queue_is_full_of_interactive():
+    async def scenario():
+        scheduler = RequestScheduler(max_concurrency=1, max_queue_depth=2)
+        release = asyncio.Event()
+        tasks = [
+            asyncio.create_task(_queue_request(scheduler, PRIORITY_INTERACTIVE, f"client-{i}", release))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+
+        scheduler.bind(PRIORITY_INTERACTIVE, "late")
+        with pytest.raises(AdmissionRejected):
+            scheduler.check_admission("late")
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+def test_cancelled_waiters_release_their_slots():
+    async def scenario():
+        scheduler = RequestScheduler(max_concurrency=1, max_queue_depth=5)
+        release = asyncio.Event()
+        tasks = await _fill_with_batch_backlog(scheduler, release)
+
+        # The holder's slot is granted to a waiter in the same step that cancels it.
+        for task in tasks:
+            task.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=5)
+        assert all(isinstance(r, asyncio.CancelledError) for r in results)
+        assert scheduler.active == 0 and scheduler.queued == 0
+
+    asyncio.run(scenario())
+
+def test_expired_waiter_is_rejected():
+    async def scenario():
+        scheduler = RequestScheduler(max_concurrency=1, max_queue_depth=5)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_queue_request(scheduler, PRIORITY_BATCH, "holder", release))
+        await asyncio.sleep(0)
+
+        scheduler.bind(PRIORITY_BATCH, "late", queue_timeout=0.01)
+        with pytest.raises(AdmissionRejected):
+            async with scheduler.slot():
+                pass
+        assert scheduler.expired == 1 and scheduler.queued == 0
+
+        release.set()
+        await holder
+        assert scheduler.active == 0
+
+    asyncio.run(scenario())
+
+def test_pending_batch_urls_are_reported():
+    scheduler = RequestScheduler()
+    scheduler.hold_pending("client", 500)
+    scheduler.release_pending("client")
+    assert scheduler.stats()["pending_batch"] == 499
+    assert scheduler.stats()["pending_batch_by_client"] == {"client": 499}
+
+    scheduler.release_pending("client", 499)
+    assert scheduler.stats()["pending_batch_by_client"] == {}